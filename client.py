@@ -13,33 +13,60 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-import json
-import requests
+import httpx
 
-from six.moves.urllib import parse as urlparse
+try:
+    import orjson as jsonlib
+except ImportError:
+    import json as jsonlib
+
+from urllib import parse as urlparse
 
 
 class APIClient(object):
     """This class handles API requests."""
 
-    def __init__(self, url):
+    def __init__(self, url, disable_compression=False):
         self.root = "{url}".format(url=url)
         self._session = None
+        self._disable_compression = disable_compression
         self.api_root = urlparse.urljoin(self.root, "/api/v1/")
+        self._url_cache = {}
 
-    @staticmethod
-    def _make_common_headers():
+    def _url(self, api):
+        """Returns the full URL of an API path, cached per path."""
+
+        url = self._url_cache.get(api)
+        if url is None:
+            url = self._url_cache[api] = self.api_root + api
+        return url
+
+    def _make_common_headers(self):
         """Returns a dict of HTTP headers common for all requests."""
 
-        return {'Content-Type': 'application/json',
-                'Accept': 'application/json'}
+        headers = {'Content-Type': 'application/json',
+                   'Accept': 'application/json'}
+        if self._disable_compression:
+            # For a local/same-LAN server gzip decompression costs CPU
+            # without saving any meaningful bandwidth
+            headers['Accept-Encoding'] = 'identity'
+        return headers
 
     def _make_session(self):
         """Initializes a HTTP session."""
 
-        session = requests.Session()
-        session.headers.update(self._make_common_headers())
-        return session
+        # HTTP/2 lets concurrent queries multiplex over one connection;
+        # the limits size the keep-alive pool so concurrent requests do
+        # not have to wait for a free connection
+        limits = httpx.Limits(max_keepalive_connections=16,
+                              max_connections=32)
+        # httpx defaults to a 5 s timeout; disable it to keep the old
+        # requests.Session behavior, where heavy (e.g. slow PromQL)
+        # queries may legitimately take longer
+        return httpx.Client(http2=True,
+                            headers=self._make_common_headers(),
+                            limits=limits,
+                            timeout=None)
 
     @property
     def session(self):
@@ -55,7 +82,7 @@ class APIClient(object):
         :param api: API endpoint(path)
         """
 
-        url = self.api_root + api
+        url = self._url(api)
         resp = self.session.delete(url)
         self._raise_for_status_with_info(resp)
 
@@ -69,9 +96,9 @@ class APIClient(object):
         :param params: Params of query string
         """
 
-        url = self.api_root + api
-        data_json = json.dumps(data)
-        resp = self.session.put(url, data=data_json, params=params)
+        url = self._url(api)
+        data_json = jsonlib.dumps(data)
+        resp = self.session.put(url, content=data_json, params=params)
         self._raise_for_status_with_info(resp)
         return self._decode_content(resp)
 
@@ -82,7 +109,7 @@ class APIClient(object):
         :param params: params passed to GET request
         """
 
-        url = self.api_root + api
+        url = self._url(api)
         return self.session.get(url, params=params)
 
     def get_request(self, api, params=None):
@@ -100,10 +127,10 @@ class APIClient(object):
         :param data: data send in request, will be serialized to JSON
         """
 
-        url = self.api_root + api
-        data_json = None if data is None else json.dumps(data)
+        url = self._url(api)
+        data_json = None if data is None else jsonlib.dumps(data)
 
-        return self.session.post(url, data=data_json)
+        return self.session.post(url, content=data_json)
 
     def post_request(self, api, data=None):
         """Make POST request to specific API with some data."""
@@ -116,12 +143,12 @@ class APIClient(object):
     def _decode_content(response):
         if response.status_code == 204:
             return {}
-        return response.json()
+        return jsonlib.loads(response.content)
 
     @staticmethod
     def _get_error_body(error):
         try:
-            error_body = json.loads(error.response.text)['message']
+            error_body = jsonlib.loads(error.response.content)['message']
         except (ValueError, TypeError, KeyError):
             error_body = error.response.text
         return error_body
@@ -129,6 +156,7 @@ class APIClient(object):
     def _raise_for_status_with_info(self, response):
         try:
             response.raise_for_status()
-        except requests.exceptions.HTTPError as e:
-            "{} ({})".format(e, self._get_error_body(e))
-            raise
+        except httpx.HTTPStatusError as e:
+            msg = "{} ({})".format(e, self._get_error_body(e))
+            raise httpx.HTTPStatusError(msg, request=e.request,
+                                        response=e.response) from e
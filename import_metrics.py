@@ -15,15 +15,23 @@
 #    under the License.
 
 import argparse
+import collections
+import concurrent.futures
+import functools
+import itertools
 import logging
-import logging.handlers
 import sys
 
-import boto3
-import requests
+import httpx
 
-from botocore.exceptions import ClientError
-from botocore.exceptions import BotoCoreError
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# boto3/botocore are imported lazily: loading their service models takes
+# hundreds of ms and is wasted whenever no CloudWatch call happens
+# (--dump mode, imports by tests/tools)
 
 import client
 import validator
@@ -35,6 +43,8 @@ FILE_LOG_FORMAT = ('%(asctime)s.%(msecs)03d %(levelname)s '
                    '(%(module)s) %(message)s')
 LOG_FILE_SIZE = 10485760  #  10MB
 ROTATE_LOG_FILE_COUNT = 5
+FETCH_WORKERS = 16
+PUSH_WORKERS = 8
 
 
 def get_settings(file_path):
@@ -55,6 +65,24 @@ def get_settings(file_path):
     return data
 
 
+@functools.lru_cache()
+def get_cloudwatch_client(region):
+    """Returns a CloudWatch client for the given region, cached per region.
+
+    Client creation loads service models from disk and builds a new
+    botocore session, so repeated invocations (library use) reuse one
+    client. The pool size covers the concurrent PutMetricData workers
+    and the adaptive retry mode backs off on throttling.
+    """
+
+    import boto3
+    from botocore import config as botocore_config
+
+    config = botocore_config.Config(retries={'mode': 'adaptive'},
+                                    max_pool_connections=16)
+    return boto3.client('cloudwatch', region_name=region, config=config)
+
+
 def get_metrics_data(client_api, metrics):
     """Gets all data for specific metrics.
 
@@ -62,28 +90,51 @@ def get_metrics_data(client_api, metrics):
     :type client_api: client.APIClient
     :param metrics: list of metrics to retrieve data
     :type metrics: list
-    :return: list of metrics data
-    :rtype: list[dict]
+    :return: generator of metrics data, in configured metric order
+    :rtype: collections.Iterable[dict]
     """
 
     logging.info("Start fetching metrics from Prometheus.")
-    metrics_data_list = []
-    for metric in metrics:
-        params = {'query': metric}
-        try:
-            data = client_api.get_request('query', params)
-        except requests.exceptions.RequestException as e:
-            logging.error("Received error: {}".format(e), exc_info=True)
-            raise
-        # Prometheus returns false-positive result for non-existent metrics.
-        # We have to skip non-existent metrics, i.e. those with empty data
-        if not data['data']['result']:
-            logging.warning("Metric '{0}' not found.".format(metric))
-            continue
-        metrics_data_list.append(data)
+    # Queries are independent and I/O-bound, so fetch them concurrently
+    # over the session's keep-alive connection pool. Responses are
+    # yielded in submission order while the queries of a bounded window
+    # keep running in the background, so downstream conversion and
+    # pushing overlap with fetching. Submitting a window at a time --
+    # instead of every query up front -- and dropping each Future once
+    # consumed caps the number of responses held in memory at the
+    # window size, however slowly the consumer drains the generator
+    fetched = 0
+    window = 2 * FETCH_WORKERS
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=FETCH_WORKERS) as executor:
+        def submit(metric):
+            return executor.submit(client_api.get_request,
+                                   'query', {'query': metric})
+
+        metrics_iter = iter(metrics)
+        pending = collections.deque(
+            (metric, submit(metric))
+            for metric in itertools.islice(metrics_iter, window))
+        while pending:
+            metric, future = pending.popleft()
+            # Top the window back up before blocking on the result
+            for next_metric in itertools.islice(metrics_iter, 1):
+                pending.append((next_metric, submit(next_metric)))
+            try:
+                data = future.result()
+            except httpx.HTTPError as e:
+                logging.error("Received error: {}".format(e), exc_info=True)
+                raise
+            # Prometheus returns false-positive result for non-existent
+            # metrics. We have to skip non-existent metrics, i.e. those
+            # with empty data
+            if not data['data']['result']:
+                logging.warning("Metric '{0}' not found.".format(metric))
+                continue
+            fetched += 1
+            yield data
     logging.info("{0} out of {1} metrics were successfully fetched from "
-                 "Prometheus.".format(len(metrics_data_list), len(metrics)))
-    return metrics_data_list
+                 "Prometheus.".format(fetched, len(metrics)))
 
 
 def create_metric_dimensions(data):
@@ -104,62 +155,136 @@ def create_metric_dimensions(data):
 def convert_value(value):
     """Converts metric value to float."""
 
+    # Fast path for plain decimal values; only unusual ones ('1e9',
+    # 'NaN', '+Inf', garbage) pay for the try/except below. The guard
+    # allows at most one leading '-' and uses isdecimal(), so strings
+    # float() rejects (e.g. '--5', superscript digits) never reach the
+    # unguarded conversion
+    decimal = value[1:] if value.startswith('-') else value
+    if decimal.replace('.', '', 1).isdecimal():
+        return float(value)
     try:
         return float(value)
     except ValueError:
         return value
 
 
-def prepare_single_metric(name, value, dimensions, timestamp, unit='None'):
-    """Creates CloudWatch valid metric data format."""
+def _convert_values(values):
+    """Converts a batch of metric values to floats."""
+
+    if numpy is not None and values:
+        # One vectorized str->float parse for the common all-numeric
+        # batch ('1e9', 'NaN' and 'Inf' included); fall back to
+        # per-value conversion when any entry is not numeric
+        try:
+            return numpy.asarray(values, dtype=numpy.float64).tolist()
+        except ValueError:
+            pass
+    return [convert_value(value) for value in values]
+
+
+class _Metric(object):
+    """Lightweight intermediate metric record.
+
+    A slotted object is about 3x smaller than the CloudWatch-shaped
+    dict, which is only materialized at the PutMetricData/dump boundary
+    via _to_cw.
+    """
+
+    __slots__ = ('name', 'dimensions', 'timestamp', 'value', 'unit')
+
+    def __init__(self, name, dimensions, timestamp, value, unit='Count'):
+        self.name = name
+        self.dimensions = dimensions
+        self.timestamp = timestamp
+        self.value = value
+        self.unit = unit
+
+
+def _to_cw(metric):
+    """Converts a metric record to the CloudWatch-shaped dict."""
 
     return {
-            'MetricName': name,
-            'Dimensions': dimensions,
-            'Timestamp': timestamp,
-            'Value': convert_value(value),
-            'Unit': unit
-        }
+        'MetricName': metric.name,
+        'Dimensions': metric.dimensions,
+        'Timestamp': metric.timestamp,
+        'Value': metric.value,
+        'Unit': metric.unit
+    }
 
 
 def prepare_metrics(data):
     """Converts Prometheus metric data format to CloudWatch one.
 
-    :param data: list of metrics data in Prometheus-like format
-    :type data: list[dict]
-    :return: list of metrics data in CloudWatch-like format 
-    :rtype: list[dict]
+    :param data: iterable of metrics data in Prometheus-like format
+    :type data: collections.Iterable[dict]
+    :return: generator of metric records, see _to_cw for the
+             CloudWatch-shaped dict
+    :rtype: collections.Iterable[_Metric]
     """
 
     logging.info("Start converting metrics to CloudWatch format.")
-    metrics = []
+    # The loop body runs once per sample, so bind the hot names locally
+    # and build the metric dict inline instead of paying extra function
+    # frames and global lookups per sample
+    _dimensions = create_metric_dimensions
+    count = 0
     for item in data:
+        # Samples of one time-series share the same label dict, so
+        # memoize dimension lists by label-dict identity instead of
+        # rebuilding an identical list per sample. The cache is scoped
+        # to one response: ids are only guaranteed unique while that
+        # response is alive, and a freed dict's id may be recycled by a
+        # later one. Sharing the list reference is safe: boto3
+        # serializes each metric independently
+        dim_cache = {}
+        # Collect per-sample metadata and the raw value strings of one
+        # response as parallel lists, so its values convert in one
+        # vectorized call, then yield metric by metric; the staging
+        # lists only ever hold the samples of the current response
+        records = []
+        values_raw = []
+        _add_record = records.append
+        _add_value = values_raw.append
         for i in item['data']['result']:
-            single_metric_data = prepare_single_metric(
-                name=i['metric']['__name__'],
-                value=i['value'][1],
-                dimensions=create_metric_dimensions(i['metric']),
-                timestamp=i['value'][0],
-                unit='Count'
-            )
-            metrics.append(single_metric_data)
+            labels = i['metric']
+            timestamp, value = i['value']
+            key = id(labels)
+            dims = dim_cache.get(key)
+            if dims is None:
+                dims = dim_cache[key] = _dimensions(labels)
+            _add_record((labels['__name__'], dims, timestamp))
+            _add_value(value)
+        for (name, dims, timestamp), value in zip(
+                records, _convert_values(values_raw)):
+            yield _Metric(name, dims, timestamp, value)
+        count += len(records)
     logging.info("{0} metrics are ready to be pushed to "
-                 "CloudWatch.".format(len(metrics)))
-    return metrics
+                 "CloudWatch.".format(count))
 
 
 def chunks(data, n):
-    """Yield successive n-sized chunks from metrics data list."""
+    """Yield successive n-sized chunks from an iterable of metrics data.
+
+    Consumes the input lazily via itertools.islice, so it works on
+    generators as well as lists and never copies slices of the input.
+    """
 
-    for i in range(0, len(data), n):
-        yield data[i:i + n]
+    iterator = iter(data)
+    while True:
+        chunk = list(itertools.islice(iterator, n))
+        if not chunk:
+            return
+        yield chunk
 
 
 def configure_logging(level=logging.INFO, file_path=None):
     logging.basicConfig(level=level, format=CONSOLE_LOG_FORMAT)
 
     if file_path:
-        fh = logging.handlers.RotatingFileHandler(
+        from logging import handlers
+
+        fh = handlers.RotatingFileHandler(
             filename=file_path,
             maxBytes=LOG_FILE_SIZE,
             backupCount=ROTATE_LOG_FILE_COUNT
@@ -186,6 +311,11 @@ def main():
                         choices=utils.SUPPORTED_FILE_FORMATS,
                         default='json',
                         help='Format of metrics file dump. Defaults to json.')
+    parser.add_argument('--no-compression',
+                        action='store_true',
+                        help='Request uncompressed responses from '
+                             'Prometheus. Saves CPU when the server '
+                             'is co-located.')
     parser.add_argument('-v',
                         '--verbose',
                         action='store_true',
@@ -207,26 +337,68 @@ def main():
     aws_region = settings.get('aws-region')
 
     # APIClient to fetch data from Prometheus
-    client_api = client.APIClient(url=url)
+    client_api = client.APIClient(url=url,
+                                  disable_compression=args.no_compression)
+    # The fetch -> convert -> push pipeline is streamed: a bounded
+    # window of responses and push batches is in flight at a time and
+    # pushing starts before the last query has returned
     metrics_data = get_metrics_data(client_api, metrics)
-    cw_metrics_data = prepare_metrics(metrics_data)
-    dump_type = {'prometheus': metrics_data, 'cloudwatch': cw_metrics_data}
     if args.dump:
+        # Dumping to file is the only case that needs the whole data
+        # set materialized
+        dump_type = {
+            'prometheus': lambda: list(metrics_data),
+            'cloudwatch': lambda: [_to_cw(m)
+                                   for m in prepare_metrics(metrics_data)]}
         file_name = "{0}.{1}".format(args.dump, args.format)
-        utils.write_to_file(file_name, dump_type[args.dump])
+        utils.write_to_file(file_name, dump_type[args.dump]())
         logging.info("Dump file '{0}' successfully created".format(file_name))
         sys.exit()
+    cw_metrics_data = prepare_metrics(metrics_data)
 
     logging.info("Start pushing metrics to CloudWatch.")
+    from botocore.exceptions import BotoCoreError
+    from botocore.exceptions import ClientError
     try:
-        cw_client = boto3.client('cloudwatch', region_name=aws_region)
-        # Split imported metrics list in chunks,
-        # since only 20/PutMetricData per request is allowed
-        for chunk in chunks(cw_metrics_data, 20):
-            cw_client.put_metric_data(Namespace=namespace, MetricData=chunk)
+        cw_client = get_cloudwatch_client(aws_region)
     except (BotoCoreError, ClientError) as e:
         logging.error("Received error: {}".format(e), exc_info=True)
         raise
+    # Split imported metrics list in chunks, since only 20/PutMetricData
+    # per request is allowed. The chunks are independent, so push them
+    # concurrently and aggregate failures instead of aborting on the
+    # first failed batch
+    errors = []
+
+    def handle_completed(done_futures):
+        for future in done_futures:
+            try:
+                future.result()
+            except (BotoCoreError, ClientError) as e:
+                logging.error("Received error: {}".format(e), exc_info=True)
+                errors.append(e)
+
+    with concurrent.futures.ThreadPoolExecutor(
+            max_workers=PUSH_WORKERS) as executor:
+        # Batch the metric stream into chunks of 20 without
+        # materializing the full list. Submissions are held to a small
+        # in-flight window, so a fast fetch side cannot drain the whole
+        # pipeline into the executor queue; each chunk is pushed in the
+        # background while the next one is still being fetched
+        pending = set()
+        for chunk in chunks(cw_metrics_data, 20):
+            pending.add(executor.submit(cw_client.put_metric_data,
+                                        Namespace=namespace,
+                                        MetricData=[_to_cw(m)
+                                                    for m in chunk]))
+            if len(pending) >= 2 * PUSH_WORKERS:
+                done, pending = concurrent.futures.wait(
+                    pending,
+                    return_when=concurrent.futures.FIRST_COMPLETED)
+                handle_completed(done)
+        handle_completed(concurrent.futures.wait(pending).done)
+    if errors:
+        raise errors[0]
     logging.info("Metrics were successfully pushed to CloudWatch.")
 
 
@@ -17,13 +17,46 @@ import os
 import yaml
 import json
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 
 SUPPORTED_FILE_FORMATS = ('json', 'yaml')
 
+# Prefer the libyaml C implementation when PyYAML was built with it;
+# resolve the choice once at import time
+_YamlSafeLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+_YamlSafeDumper = getattr(yaml, 'CSafeDumper', yaml.SafeDumper)
+
+
+def _yaml_load(stream):
+    return yaml.load(stream, Loader=_YamlSafeLoader)
+
+
+def _yaml_dump(data, stream):
+    yaml.dump(data, stream, Dumper=_YamlSafeDumper, default_flow_style=False)
+
+
+def _json_load(stream):
+    if orjson is not None:
+        return orjson.loads(stream.read())
+    return json.load(stream)
+
+
+def _json_dump(data, stream):
+    # Serialize to a single bytes buffer and write it in one call;
+    # expects a stream opened in binary mode
+    if orjson is not None:
+        stream.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    else:
+        stream.write(json.dumps(data, indent=4).encode('utf-8'))
+
 
 def safe_load(data_format, stream):
-    loaders = {'json': json.load,
-               'yaml': yaml.safe_load}
+    loaders = {'json': _json_load,
+               'yaml': _yaml_load}
 
     if data_format not in loaders:
         raise ValueError('Unsupported data format. '
@@ -34,12 +67,8 @@ def safe_load(data_format, stream):
 
 
 def safe_dump(data_format, stream, data):
-    yaml_dumper = lambda data, stream: yaml.safe_dump(data,
-                                                      stream,
-                                                      default_flow_style=False)
-    json_dumper = lambda data, stream: json.dump(data, stream, indent=4)
-    dumpers = {'json': json_dumper,
-               'yaml': yaml_dumper}
+    dumpers = {'json': _json_dump,
+               'yaml': _yaml_dump}
 
     if data_format not in dumpers:
         raise ValueError('Unsupported data format. '
@@ -57,5 +86,6 @@ def read_from_file(file_path):
 
 def write_to_file(file_path, data):
     data_format = os.path.splitext(file_path)[1].lstrip('.')
-    with open(file_path, 'w') as stream:
+    mode = 'wb' if data_format == 'json' else 'w'
+    with open(file_path, mode) as stream:
         safe_dump(data_format, stream, data)
@@ -16,7 +16,11 @@
 import logging
 
 import jsonschema
-import six
+
+try:
+    import fastjsonschema
+except ImportError:
+    fastjsonschema = None
 
 import utils
 
@@ -46,9 +50,36 @@ CONFIG_SCHEMA = {
     }
 
 
+# Compiled validators cached per schema, so the schema is only
+# (re)compiled on the first validation instead of on every call
+_validator_cache = {}
+_fast_validator_cache = {}
+
+
+def _get_validator(schema):
+    key = id(schema)
+    validator = _validator_cache.get(key)
+    if validator is None:
+        validator = _validator_cache[key] = jsonschema.Draft4Validator(schema)
+    return validator
+
+
 def validate_schema(data, schema, file_path, value_path=None):
+    if fastjsonschema is not None:
+        key = id(schema)
+        fast_validate = _fast_validator_cache.get(key)
+        if fast_validate is None:
+            fast_validate = fastjsonschema.compile(schema)
+            _fast_validator_cache[key] = fast_validate
+        try:
+            fast_validate(data)
+            return
+        except fastjsonschema.JsonSchemaException:
+            # Re-validate with jsonschema below, which produces the
+            # detailed error message
+            pass
     try:
-        jsonschema.validate(data, schema)
+        _get_validator(schema).validate(data)
     except jsonschema.exceptions.ValidationError as exc:
         logger.error(_make_error_message(exc, file_path, value_path),
                      exc_info=True)
@@ -84,7 +115,7 @@ def _make_error_message(exc, file_path, value_path):
     error_msg = "File '{0}', {1}".format(file_path, message)
 
     if value_path:
-        value_path = ' -> '.join(map(six.text_type, value_path))
+        value_path = ' -> '.join(map(str, value_path))
         error_msg = '{0}, {1}'.format(
             error_msg, "value path '{0}'".format(value_path))
 